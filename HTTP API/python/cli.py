@@ -19,7 +19,9 @@ import requests
 import signal
 import sys
 from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPDigestAuth
+from urllib3.util.retry import Retry
 
 # Configuration Constants
 CAMERA_HOST = "192.168.1.100"  # Change to your camera's IP address or hostname
@@ -35,6 +37,20 @@ class PTZOpticsHTTPController:
         self.running = False
         self.session = requests.Session()
 
+        # Keep connections to the camera alive between commands and retry
+        # requests that fail to connect or get a transient server error,
+        # returning the last response once retries run out so its status is
+        # still reported. Read timeouts are not retried, the camera may
+        # already have acted on the command, e.g. started moving.
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=10,
+            max_retries=Retry(total=2, read=0, backoff_factor=0.1, status_forcelist=[502, 503, 504],
+                              raise_on_status=False)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
         # Set up digest authentication if credentials provided
         if username and password:
             self.session.auth = HTTPDigestAuth(username, password)
@@ -79,18 +95,24 @@ class PTZOpticsHTTPController:
                 else:
                     response = self.session.get(url, params=command["params"] if command["params"] else None, timeout=10)
 
+            # Decode the body once, as UTF-8 when the camera sends no charset,
+            # rather than letting requests guess the encoding from the content
+            if response.encoding is None:
+                response.encoding = "utf-8"
+            body = response.text
+
             # Check response
             if response.status_code == 200:
                 print(f"   ✅ Command successful (HTTP {response.status_code})")
-                if response.text.strip():
+                if body.strip():
                     # Show first line of response if available
-                    first_line = response.text.strip().split('\n')[0][:100]
+                    first_line = body.strip().split('\n')[0][:100]
                     print(f"   Response: {first_line}...")
                 return True
             else:
                 print(f"   ❌ Command failed (HTTP {response.status_code})")
-                if response.text:
-                    print(f"   Error: {response.text[:200]}...")
+                if body:
+                    print(f"   Error: {body[:200]}...")
                 return False
 
         except requests.RequestException as e:
@@ -16,17 +16,98 @@ Requirements:
 """
 
 import requests
+import queue
+import sched
 import time
 import threading
 import signal
 import sys
+import traceback
+from concurrent.futures import Future, wait
 from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPDigestAuth
+from urllib3.util.retry import Retry
 
 # Configuration Constants
 CAMERA_HOST = "192.168.1.100" # Add in your camera host
 CAMERA_USERNAME = "admin"
 CAMERA_PASSWORD = "admin"
+COMMAND_INTERVAL = 5  # Seconds between commands
+
+class CommandScheduler:
+    """Runs the command timers of every controller from one background thread
+
+    Each timer tick is handed to a small shared pool of worker threads, so many
+    controllers need neither one sleeping thread each nor wait on each other.
+    """
+    
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.tasks = queue.Queue()
+        self.workers = []
+        self.wakeup = threading.Event()
+        self.scheduler = sched.scheduler(time.monotonic, self.wait)
+        self.thread = None
+        self.lock = threading.Lock()
+    
+    def submit(self, action):
+        """Run action on a worker thread and return a Future for its result
+
+        The workers are daemon threads, unlike those of a ThreadPoolExecutor,
+        so a request that is still waiting on the camera doesn't hold up exit.
+        """
+        future = Future()
+        self.tasks.put((future, action))
+        with self.lock:
+            if not self.workers:
+                for _ in range(self.max_workers):
+                    worker = threading.Thread(target=self.work, daemon=True)
+                    worker.start()
+                    self.workers.append(worker)
+        return future
+    
+    def work(self):
+        """Worker thread - run submitted actions one after another"""
+        while True:
+            future, action = self.tasks.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(action())
+            except BaseException as e:
+                future.set_exception(e)
+    
+    def wait(self, delay):
+        """Sleep until the next timer is due, or until a new timer is added"""
+        if self.wakeup.wait(delay):
+            self.wakeup.clear()
+    
+    def run(self):
+        """Scheduler thread - wait for timers to be added and run them when due"""
+        while True:
+            self.scheduler.run()
+            self.wait(None)
+    
+    def enterabs(self, when, action):
+        """Run action on the scheduler thread at the given time.monotonic() time"""
+        event = self.scheduler.enterabs(when, 1, action)
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return event
+    
+    def cancel(self, event):
+        """Cancel a timer, ignoring one that has already run"""
+        try:
+            self.scheduler.cancel(event)
+        except ValueError:
+            pass
+
+# Shared by all controllers in this program
+command_scheduler = CommandScheduler()
 
 class PTZOpticsHTTPController:
     def __init__(self, host="ptzoptics.local", username="admin", password="admin"):
@@ -36,9 +117,25 @@ class PTZOpticsHTTPController:
         self.password = password
         self.running = False
         self.command_index = 0
-        self.timer_thread = None
+        self.timer_event = None
+        self.timer_future = None
+        self.next_tick = None
         self.session = requests.Session()
         
+        # Keep connections to the camera alive between commands and retry
+        # requests that fail to connect or get a transient server error,
+        # returning the last response once retries run out so its status is
+        # still reported. Read timeouts are not retried, the camera may
+        # already have acted on the command, e.g. started moving.
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=10,
+            max_retries=Retry(total=2, read=0, backoff_factor=0.1, status_forcelist=[502, 503, 504],
+                              raise_on_status=False)
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
         # Set up digest authentication if credentials provided
         if username and password:
             self.session.auth = HTTPDigestAuth(username, password)
@@ -72,6 +169,10 @@ class PTZOpticsHTTPController:
             "Stop Pan/Tilt",
             "Pan Right (Speed 12/10)",
         ]
+        
+        # Build each full command URL once instead of on every send
+        for command in self.cgi_commands:
+            command["full_url"] = urljoin(self.base_url, command["url"])
     
     def test_connection(self):
         """Test connection to the PTZ camera"""
@@ -94,14 +195,30 @@ class PTZOpticsHTTPController:
             print(f"❌ Connection error: {e}")
             return False
     
-    def send_command(self, command):
-        """Send an HTTP-CGI command to the camera"""
+    def send_command(self, command, output=None):
+        """Send an HTTP-CGI command to the camera
+
+        Args:
+            command: Command dictionary with url, params and method
+            output: List to collect the log lines in, they are printed when the
+                    command finishes if not given
+        """
+        lines = [] if output is None else output
+        try:
+            return self.send_command_logged(command, lines)
+        finally:
+            # One write per command instead of one per line
+            if output is None and lines:
+                print("\n".join(lines))
+    
+    def send_command_logged(self, command, lines):
+        """Send an HTTP-CGI command, adding its log lines to lines"""
         try:
-            # Build the full URL
-            url = urljoin(self.base_url, command["url"])
+            # Use the prebuilt URL, building it for commands not in cgi_commands
+            url = command.get("full_url") or urljoin(self.base_url, command["url"])
             
             # Display the URL being sent
-            print(f"   URL: {command['url']}")
+            lines.append(f"   URL: {command['url']}")
             
             # Send the request
             if command["method"].upper() == "POST":
@@ -109,22 +226,28 @@ class PTZOpticsHTTPController:
             else:
                 response = self.session.get(url, params=command["params"] if command["params"] else None, timeout=10)
             
+            # Decode the body once, as UTF-8 when the camera sends no charset,
+            # rather than letting requests guess the encoding from the content
+            if response.encoding is None:
+                response.encoding = "utf-8"
+            body = response.text
+            
             # Check response
             if response.status_code == 200:
-                print(f"   ✅ Command successful (HTTP {response.status_code})")
-                if response.text.strip():
+                lines.append(f"   ✅ Command successful (HTTP {response.status_code})")
+                if body.strip():
                     # Show first line of response if available
-                    first_line = response.text.strip().split('\n')[0][:100]
-                    print(f"   Response: {first_line}...")
+                    first_line = body.strip().split('\n')[0][:100]
+                    lines.append(f"   Response: {first_line}...")
                 return True
             else:
-                print(f"   ❌ Command failed (HTTP {response.status_code})")
-                if response.text:
-                    print(f"   Error: {response.text[:200]}...")
+                lines.append(f"   ❌ Command failed (HTTP {response.status_code})")
+                if body:
+                    lines.append(f"   Error: {body[:200]}...")
                 return False
                 
         except requests.RequestException as e:
-            print(f"   ❌ Request error: {e}")
+            lines.append(f"   ❌ Request error: {e}")
             return False
     
     def send_next_command(self):
@@ -138,34 +261,51 @@ class PTZOpticsHTTPController:
                       if self.command_index < len(self.command_descriptions) 
                       else f"Command {self.command_index + 1}")
         
-        print(f"\n📤 Sending: {description}")
-        self.send_command(command)
+        output = [f"\n📤 Sending: {description}"]
+        self.send_command(command, output)
+        print("\n".join(output))
         
         # Move to next command (cycle through the list)
         self.command_index = (self.command_index + 1) % len(self.cgi_commands)
     
     def command_timer(self):
-        """Timer function that sends commands every 5 seconds"""
-        while self.running:
-            if self.running:  # Double-check we're still running
-                self.send_next_command()
-            time.sleep(5)  # 5 second interval
+        """Timer callback that sends the next command every COMMAND_INTERVAL seconds"""
+        if not self.running:
+            return
+        
+        # Send on the shared pool, skipping this tick if the last send is still busy
+        if self.timer_future is None or self.timer_future.done():
+            if self.timer_future is not None and self.timer_future.exception():
+                error = self.timer_future.exception()
+                traceback.print_exception(type(error), error, error.__traceback__)
+            self.timer_future = command_scheduler.submit(self.send_next_command)
+        
+        # Schedule against absolute deadlines so the time spent sending doesn't add drift
+        self.next_tick += COMMAND_INTERVAL
+        now = time.monotonic()
+        if self.next_tick < now:
+            # The scheduler fell behind, start counting again from now
+            self.next_tick = now + COMMAND_INTERVAL
+        self.timer_event = command_scheduler.enterabs(self.next_tick, self.command_timer)
     
     def start(self):
         """Start the controller"""
         if self.test_connection():
             self.running = True
-            self.timer_thread = threading.Thread(target=self.command_timer, daemon=True)
-            self.timer_thread.start()
-            print("🕒 Started command timer (5 second intervals)")
+            self.next_tick = time.monotonic()
+            self.timer_event = command_scheduler.enterabs(self.next_tick, self.command_timer)
+            print(f"🕒 Started command timer ({COMMAND_INTERVAL} second intervals)")
             return True
         return False
     
     def stop(self):
         """Stop the controller"""
         self.running = False
-        if self.timer_thread:
-            self.timer_thread.join(timeout=1)
+        if self.timer_event:
+            command_scheduler.cancel(self.timer_event)
+        if self.timer_future:
+            # Let a command that is being sent finish
+            wait([self.timer_future], timeout=1)
         print("⏹️ Controller stopped")
     
     def send_single_command(self, index):
@@ -176,8 +316,9 @@ class PTZOpticsHTTPController:
                           if index < len(self.command_descriptions) 
                           else f"Command {index + 1}")
             
-            print(f"\n📤 Manual send: {description}")
-            self.send_command(command)
+            output = [f"\n📤 Manual send: {description}"]
+            self.send_command(command, output)
+            print("\n".join(output))
         else:
             print(f"❌ Invalid command index: {index}")
 
@@ -203,7 +344,7 @@ def main():
     print("PTZOptics HTTP-CGI Controller Example")
     print("=" * 40)
     print(f"Connecting to camera at: {controller.host}")
-    print("Commands will be sent every 5 seconds")
+    print(f"Commands will be sent every {COMMAND_INTERVAL} seconds")
     print("Press Ctrl+C to stop\n")
     
     # Start the controller
@@ -261,7 +402,7 @@ Speed Parameters (for pan/tilt):
 Installation:
 - Install requests: pip install requests
 - Update camera credentials in main() function
-- Modify the 5-second interval in command_timer() if needed
+- Modify COMMAND_INTERVAL to change the 5-second interval if needed
 
 Note: Some commands may require POST method with Content-Length header.
 See the HTTP-CGI documentation for POST request formatting requirements.
@@ -13,7 +13,9 @@ Requirements:
 
 import cv2
 import numpy as np
-import time
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import argparse
 
@@ -23,24 +25,45 @@ import argparse
 
 # Camera connection settings
 DEFAULT_RTSP_STREAM = "stream2"  # Use stream2 for lower latency, stream1 for higher quality
+RECONNECT_DELAY = 2              # Seconds to wait before retrying a failed RTSP connection
+FRAME_TIMEOUT = 2                # Seconds to wait for a new frame before reporting a stall
+FFMPEG_CAPTURE_OPTIONS = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay|max_delay;0"  # Low latency RTSP
+HARDWARE_DECODE = True           # Decode H.264 on the GPU video engine when available
 
 # Motion detection parameters
 DEFAULT_SENSITIVITY = 25         # Motion sensitivity (lower = more sensitive)
 DEFAULT_MIN_AREA = 300           # Minimum motion area in pixels to trigger detection
 MOTION_HOLD_FRAMES = 10          # Frames to hold motion state (reduces flickering)
+MOTION_DETECTION_INTERVAL = 4    # Run motion detection every N frames in a still scene
+SCENE_VELOCITY_GAIN = 100        # How quickly detection intervals shrink as the scene changes
+DETECTION_WIDTH = 640            # Frames wider than this are downscaled before detection
 
 # Face detection parameters
-FACE_DETECTION_INTERVAL = 5      # Run face detection every N frames (for performance)
+FACE_DETECTION_INTERVAL = 5      # Run face detection every N frames in a still scene (for performance)
 FACE_HOLD_FRAMES = 15            # Frames to hold face detection state
+FACE_ROI_PADDING = 30            # Pixels added around motion areas when searching for faces
+FACE_FULL_SCAN_INTERVAL = 10     # Scan the whole frame every N face detections to catch still faces
 
 # Background subtractor settings
 BACKGROUND_DETECT_SHADOWS = True # Enable shadow detection in background subtraction
 MORPH_KERNEL_SIZE = (3, 3)       # Kernel size for morphological operations
 
+# Face detector model - YuNet DNN detector is used when this ONNX file exists,
+# otherwise the Haar cascade bundled with OpenCV is used. Download it from
+# https://github.com/opencv/opencv_zoo/tree/main/models/face_detection_yunet
+FACE_MODEL_PATH = "face_detection_yunet_2023mar.onnx"
+FACE_SCORE_THRESHOLD = 0.9       # Minimum confidence for YuNet face detections
+
+# Face cascades tried in order when YuNet is not used. The integer LBP cascade is
+# 2-3x faster than Haar, but opencv-python only bundles the Haar files, so copy
+# lbpcascade_frontalface_improved.xml from the OpenCV sources to use it
+FACE_CASCADES = ("lbpcascade_frontalface_improved.xml", "haarcascade_frontalface_default.xml")
+
 # Person detection settings
 PERSON_SCALE_FACTOR = 1.1        # Scale factor for person detection
 PERSON_MIN_NEIGHBORS = 3         # Minimum neighbors for person detection
-PERSON_MIN_SIZE = (30, 30)       # Minimum size for person detection
+PERSON_MIN_SIZE = (30, 30)       # Minimum size for person detection (detection frame pixels)
+PERSON_MAX_SIZE_FRACTION = 3     # Faces are assumed to be at most 1/N of the frame size
 
 # Display settings
 MOTION_COLOR = (0, 255, 0)       # Green color for motion bounding boxes (BGR)
@@ -62,10 +85,11 @@ class PTZMotionDetector:
     
     This class provides real-time motion detection capabilities for PTZOptics cameras
     using RTSP streaming. It combines background subtraction for motion detection 
-    with Haar cascade classifiers for face detection.
+    with a YuNet DNN or Haar cascade classifier for face detection.
     """
     
-    def __init__(self, camera_ip, sensitivity=DEFAULT_SENSITIVITY, min_area=DEFAULT_MIN_AREA, stream="stream2"):
+    def __init__(self, camera_ip, sensitivity=DEFAULT_SENSITIVITY, min_area=DEFAULT_MIN_AREA, stream="stream2",
+                 face_model=FACE_MODEL_PATH):
         """
         Initialize the motion detector for a PTZOptics camera.
         
@@ -74,6 +98,7 @@ class PTZMotionDetector:
             sensitivity (int): Motion sensitivity threshold (lower = more sensitive)
             min_area (int): Minimum area in pixels to consider as motion
             stream (str): RTSP stream to use (stream1 for higher quality, stream2 for lower latency)
+            face_model (str): Path to a YuNet ONNX model, Haar cascade is used if the file is missing
         """
         self.camera_ip = camera_ip
         self.rtsp_url = f"rtsp://{camera_ip}/{stream}"
@@ -81,180 +106,523 @@ class PTZMotionDetector:
         
         self.sensitivity = sensitivity
         self.min_area = min_area
+        self.detect_width = DETECTION_WIDTH
+        
+        # Use the GPU for background subtraction when OpenCV was built with CUDA
+        try:
+            self.use_cuda = cv2.cuda.getCudaEnabledDeviceCount() > 0
+        except (AttributeError, cv2.error):
+            self.use_cuda = False
+        
+        # Otherwise let OpenCV's transparent API offload work to an OpenCL device
+        # (integrated or discrete GPU) by passing cv2.UMat inputs
+        self.use_opencl = not self.use_cuda and cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            print("OpenCL device found, offloading detection through cv2.UMat")
+            cv2.ocl.setUseOpenCL(True)
+        
+        # Noise removal kernel and reusable mask buffers, built once instead of per frame
+        self.morph_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, MORPH_KERNEL_SIZE)
+        self.fg_mask_buffer = None
+        self.fg_buffer = None
+        
+        # Rotating grayscale buffers - the current frame plus the two kept for
+        # the scene velocity estimate
+        self.gray_buffers = [None, None, None]
+        self.gray_index = 0
         
         # Initialize background subtractor for motion detection
-        self.background_subtractor = cv2.createBackgroundSubtractorMOG2(
-            detectShadows=BACKGROUND_DETECT_SHADOWS
-        )
+        if self.use_cuda:
+            print("CUDA device found, running background subtraction on the GPU")
+            self.background_subtractor = cv2.cuda.createBackgroundSubtractorMOG2(
+                detectShadows=BACKGROUND_DETECT_SHADOWS
+            )
+            self.cuda_stream = cv2.cuda_Stream()
+            self.gpu_frame = cv2.cuda_GpuMat()
+            self.cuda_morph_filter = cv2.cuda.createMorphologyFilter(
+                cv2.MORPH_OPEN, cv2.CV_8UC1, self.morph_kernel
+            )
+        else:
+            self.background_subtractor = cv2.createBackgroundSubtractorMOG2(
+                detectShadows=BACKGROUND_DETECT_SHADOWS
+            )
         
-        # Load Haar cascade classifier for face detection
-        self.person_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
+        # Prefer the YuNet DNN face detector, which runs at a fixed low input
+        # resolution and is much faster than a Haar cascade
+        self.face_net = None
+        self.person_cascade = None
+        if face_model and os.path.exists(face_model):
+            print(f"Using YuNet face detector: {face_model}")
+            self.face_net = cv2.FaceDetectorYN.create(
+                face_model, "", (320, 240),
+                score_threshold=FACE_SCORE_THRESHOLD,
+                backend_id=cv2.dnn.DNN_BACKEND_OPENCV,
+                target_id=cv2.dnn.DNN_TARGET_OPENCL if self.use_opencl else cv2.dnn.DNN_TARGET_CPU
+            )
+            self.face_input_size = (320, 240)
+        else:
+            self.person_cascade = self.load_face_cascade()
         
         # Motion smoothing to reduce flickering between motion/no-motion states
         self.motion_frames_count = 0
         self.motion_hold_frames = MOTION_HOLD_FRAMES
         
+        # Motion detection frame skipping, adapted to scene velocity
+        self.motion_detection_counter = 0
+        self.motion_detection_interval = MOTION_DETECTION_INTERVAL
+        self.last_motion_result = (False, [], None)
+        
+        # Last two grayscale frames, used to estimate how fast the scene changes
+        self.previous_grays = []
+        
         # Face detection frame skipping and persistence
         self.face_detection_counter = 0
+        self.face_detection_interval = FACE_DETECTION_INTERVAL
         self.face_frames_count = 0
         self.face_hold_frames = FACE_HOLD_FRAMES
-        self.last_face_result = (False, [])
+        self.last_faces = []
+        self.face_full_scan_counter = 0
         
-    def get_camera_frame(self):
+        # Face detection runs on a background worker so it never stalls the capture loop
+        self.face_executor = ThreadPoolExecutor(max_workers=1)
+        self.face_future = None
+        
+        # Background RTSP reader that keeps only the newest frame
+        self.frame_lock = threading.Lock()
+        self.frame_available = threading.Condition(self.frame_lock)
+        self.latest_frame = None
+        self.reader_stop = threading.Event()
+        self.reader_thread = None
+        
+        # Pre-rendered overlay text, keyed by text and style
+        self.text_overlays = {}
+        
+    def load_face_cascade(self):
         """
-        Retrieve a single frame from the PTZOptics camera via RTSP.
+        Load the first available cascade classifier from FACE_CASCADES.
         
-        Establishes RTSP connection on first call and maintains the stream
-        for subsequent frame captures.
+        Each file is looked for in the working directory and then in the
+        cascades bundled with OpenCV.
         
         Returns:
-            numpy.ndarray: Camera frame as BGR image, or None if retrieval failed
+            cv2.CascadeClassifier: Loaded face cascade classifier
         """
-        if self.cap is None:
-            print(f"Connecting to RTSP stream: {self.rtsp_url}")
-            self.cap = cv2.VideoCapture(self.rtsp_url)
-            if not self.cap.isOpened():
-                print("Failed to open RTSP stream")
-                return None
-        
-        ret, frame = self.cap.read()
-        if ret:
-            return frame
-        else:
-            print("Failed to read frame from RTSP stream, attempting reconnection...")
-            # Try to reconnect
+        for cascade_file in FACE_CASCADES:
+            for directory in ("", cv2.data.haarcascades):
+                path = os.path.join(directory, cascade_file)
+                if os.path.exists(path):
+                    print(f"Using face cascade: {cascade_file}")
+                    return cv2.CascadeClassifier(path)
+        
+        raise FileNotFoundError(f"No face cascade found, tried: {', '.join(FACE_CASCADES)}")
+    
+    def connect_camera(self):
+        """
+        Open the RTSP stream from the PTZOptics camera.
+        
+        Returns:
+            bool: True if the stream was opened successfully
+        """
+        print(f"Connecting to RTSP stream: {self.rtsp_url}")
+        
+        # Disable FFmpeg input buffering so reads return the newest frame.
+        # An OPENCV_FFMPEG_CAPTURE_OPTIONS value set by the user takes precedence.
+        os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", FFMPEG_CAPTURE_OPTIONS)
+        
+        # Prefer hardware decoding (CUDA, VA-API, D3D11...) - OpenCV falls back to
+        # software decoding when no accelerator is available
+        params = []
+        if HARDWARE_DECODE:
+            params = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        
+        self.cap = cv2.VideoCapture(self.rtsp_url, cv2.CAP_FFMPEG, params)
+        if not self.cap.isOpened():
+            print("Failed to open RTSP stream")
             self.cap.release()
             self.cap = None
-            return None
+            return False
+        
+        if self.cap.get(cv2.CAP_PROP_HW_ACCELERATION) > cv2.VIDEO_ACCELERATION_NONE:
+            print("Using hardware accelerated video decoding")
+        
+        # Keep at most one decoded frame queued inside OpenCV
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return True
+    
+    def frame_reader(self):
+        """
+        Continuously read frames from the RTSP stream on a background thread.
+        
+        Each new frame replaces the previous one, so detection always works on the
+        freshest frame and decoder or network jitter never queues up stale frames.
+        Reconnects automatically when the stream drops.
+        """
+        while not self.reader_stop.is_set():
+            if self.cap is None and not self.connect_camera():
+                self.reader_stop.wait(RECONNECT_DELAY)
+                continue
+            
+            ret, frame = self.cap.read()
+            if not ret:
+                print("Failed to read frame from RTSP stream, attempting reconnection...")
+                self.cap.release()
+                self.cap = None
+                self.reader_stop.wait(RECONNECT_DELAY)
+                continue
+            
+            with self.frame_available:
+                self.latest_frame = frame
+                self.frame_available.notify()
+        
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+    
+    def get_camera_frame(self):
+        """
+        Retrieve the newest frame from the PTZOptics camera via RTSP.
+        
+        Starts the background frame reader on first call. Each frame is handed
+        out only once, waiting up to FRAME_TIMEOUT seconds for a new one.
+        
+        Returns:
+            numpy.ndarray: Camera frame as BGR image, or None if no new frame arrived
+        """
+        if self.reader_thread is None:
+            self.reader_thread = threading.Thread(target=self.frame_reader, daemon=True)
+            self.reader_thread.start()
+        
+        with self.frame_available:
+            if self.latest_frame is None:
+                self.frame_available.wait(FRAME_TIMEOUT)
+            frame, self.latest_frame = self.latest_frame, None
+        return frame
     
-    def detect_motion(self, frame):
+    def prepare_detection_frame(self, frame):
+        """
+        Downscale a camera frame to the detection resolution.
+        
+        Motion and face detection only need coarse image structure, so frames
+        wider than detect_width are shrunk once per frame before analysis. This
+        keeps MOG2 and the cascade pyramid cheap on high resolution streams.
+        
+        Args:
+            frame (numpy.ndarray): Full resolution frame from camera
+            
+        Returns:
+            tuple: (detection_frame, scale)
+                - detection_frame (numpy.ndarray): Frame at detection resolution
+                - scale (float): Ratio of detection frame width to camera frame width
+        """
+        frame_width = frame.shape[1]
+        if frame_width <= self.detect_width:
+            return frame, 1.0
+        
+        scale = self.detect_width / frame_width
+        detection_frame = cv2.resize(frame, None, fx=scale, fy=scale,
+                                     interpolation=cv2.INTER_AREA)
+        return detection_frame, scale
+    
+    @staticmethod
+    def scale_rectangles(rectangles, scale):
+        """Map (x,y,w,h) rectangles from detection resolution back to the camera frame"""
+        rectangles = np.asarray(rectangles, dtype=np.float64).reshape(-1, 4)
+        return (rectangles / scale).astype(int).tolist()
+    
+    def detect_motion(self, gray, scale=1.0):
         """
         Detect motion in the current frame using background subtraction.
         
         This method uses MOG2 background subtractor to identify moving objects
         by comparing the current frame against a learned background model.
+        A single channel model is learned, which is cheaper than a BGR one.
         
         Args:
-            frame (numpy.ndarray): Input frame from camera
+            gray (numpy.ndarray): Grayscale frame at detection resolution
+            scale (float): Detection frame scale returned by prepare_detection_frame
             
         Returns:
             tuple: (motion_detected, motion_areas, foreground_mask)
                 - motion_detected (bool): True if motion above threshold detected
-                - motion_areas (list): List of (x,y,w,h) bounding rectangles
-                - foreground_mask (numpy.ndarray): Binary mask of detected motion
+                - motion_areas (list): List of (x,y,w,h) rectangles in camera frame coordinates
+                - foreground_mask (numpy.ndarray): Binary mask of detected motion, the
+                  buffer may be reused by the next call
         """
-        # Apply background subtraction
-        fg_mask = self.background_subtractor.apply(frame)
+        # min_area is given in camera frame pixels, so scale it to the detection frame
+        min_area = self.min_area * scale * scale
         
-        # Remove noise with morphological operations
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, MORPH_KERNEL_SIZE)
-        fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)
+        # In still scenes the mask is almost empty - if there are too few foreground
+        # pixels for any blob to reach min_area, skip noise removal and labelling
+        if self.use_cuda:
+            # Background subtraction and noise removal stay in GPU memory,
+            # only the final mask is downloaded for contour extraction
+            self.gpu_frame.upload(gray, self.cuda_stream)
+            fg_gpu = self.background_subtractor.apply(self.gpu_frame, -1, self.cuda_stream)
+            if cv2.cuda.countNonZero(fg_gpu) <= min_area:
+                return False, [], fg_gpu.download()
+            fg_gpu = self.cuda_morph_filter.apply(fg_gpu, stream=self.cuda_stream)
+            fg_mask = fg_gpu.download(stream=self.cuda_stream)
+            self.cuda_stream.waitForCompletion()
+        else:
+            # Apply background subtraction
+            if self.use_opencl:
+                fg_mask = self.background_subtractor.apply(cv2.UMat(gray))
+            else:
+                # MOG2 writes into the same buffer every frame
+                self.fg_mask_buffer = self.background_subtractor.apply(gray, self.fg_mask_buffer)
+                fg_mask = self.fg_mask_buffer
+            if cv2.countNonZero(fg_mask) <= min_area:
+                return False, [], fg_mask.get() if self.use_opencl else fg_mask
+            
+            # Remove noise with morphological operations
+            if self.use_opencl:
+                # Bring the mask back to host memory for contour extraction
+                fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, self.morph_kernel).get()
+            else:
+                # Write into the same buffer every frame to avoid reallocating it
+                self.fg_buffer = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, self.morph_kernel,
+                                                  dst=self.fg_buffer)
+                fg_mask = self.fg_buffer
         
-        # Find contours
-        contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Label foreground blobs - one call returns the area and bounding box of
+        # every blob, skipping row 0 which describes the background
+        _, _, stats, _ = cv2.connectedComponentsWithStats(fg_mask, connectivity=8)
+        stats = stats[1:]
         
-        motion_detected = False
-        motion_areas = []
+        large_blobs = stats[:, cv2.CC_STAT_AREA] > min_area
+        motion_detected = bool(large_blobs.any())
         
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > self.min_area:
-                motion_detected = True
-                x, y, w, h = cv2.boundingRect(contour)
-                motion_areas.append((x, y, w, h))
+        # Columns 0-3 hold left, top, width and height
+        motion_areas = stats[large_blobs, :4]
         
-        return motion_detected, motion_areas, fg_mask
-    
-    def smooth_motion_detection(self, raw_motion_detected):
-        """Apply smoothing to motion detection to reduce flickering"""
-        if raw_motion_detected:
-            self.motion_frames_count = self.motion_hold_frames
-            return True
-        else:
-            if self.motion_frames_count > 0:
-                self.motion_frames_count -= 1
-                return True
-            else:
-                return False
+        return motion_detected, self.scale_rectangles(motion_areas, scale), fg_mask
     
-    def detect_person(self, frame):
+    def detect_person(self, frame, scale=1.0, origin=(0, 0), max_size=None):
         """
-        Detect faces in the frame using Haar cascade classifier.
+        Detect faces in the frame using the YuNet DNN or Haar cascade classifier.
         
         Uses OpenCV's pre-trained face detector to identify human faces.
         More reliable than full-body detection for people at desks or partially visible.
         
         Args:
-            frame (numpy.ndarray): Input frame from camera
+            frame (numpy.ndarray): Detection frame or region of it - BGR for YuNet, grayscale for Haar
+            scale (float): Detection frame scale returned by prepare_detection_frame
+            origin (tuple): (x, y) offset of the region within the detection frame
+            max_size (tuple): Largest (w, h) face to look for, defaults to a fraction of frame
             
         Returns:
             tuple: (person_detected, people_rectangles)
                 - person_detected (bool): True if one or more faces detected
-                - people_rectangles (list): List of (x,y,w,h) detection rectangles
+                - people_rectangles (list): List of (x,y,w,h) rectangles in camera frame coordinates
+        """
+        if self.face_net is not None:
+            # YuNet needs its input size to match the frame being analysed
+            frame_size = (frame.shape[1], frame.shape[0])
+            if frame_size != self.face_input_size:
+                self.face_net.setInputSize(frame_size)
+                self.face_input_size = frame_size
+            
+            # Each detection row starts with the x, y, w, h bounding box
+            _, faces = self.face_net.detect(frame)
+            people = [] if faces is None else faces[:, :4].astype(int)
+        else:
+            # Faces never fill the whole frame of a PTZ camera, so skip the largest
+            # and most expensive levels of the cascade's image pyramid
+            if max_size is None:
+                max_size = (frame.shape[1] // PERSON_MAX_SIZE_FRACTION,
+                            frame.shape[0] // PERSON_MAX_SIZE_FRACTION)
+            
+            # Equalize contrast so faces in dim or washed out scenes are still found,
+            # cheap here because the frame is already at detection resolution
+            equalized = cv2.equalizeHist(frame)
+            
+            # Detect faces using the cascade classifier
+            people = self.person_cascade.detectMultiScale(
+                cv2.UMat(equalized) if self.use_opencl else equalized, 
+                scaleFactor=PERSON_SCALE_FACTOR, 
+                minNeighbors=PERSON_MIN_NEIGHBORS,
+                minSize=PERSON_MIN_SIZE,
+                maxSize=max_size
+            )
+        
+        # Shift results from region coordinates to detection frame coordinates
+        people = np.asarray(people, dtype=np.float64).reshape(-1, 4)
+        people[:, :2] += origin
+        
+        return len(people) > 0, self.scale_rectangles(people, scale)
+    
+    def face_search_region(self, motion_areas, scale, frame_shape):
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        Compute the detection frame region worth searching for faces.
         
-        # Detect faces using Haar cascade classifier
-        people = self.person_cascade.detectMultiScale(
-            gray, 
-            scaleFactor=PERSON_SCALE_FACTOR, 
-            minNeighbors=PERSON_MIN_NEIGHBORS,
-            minSize=PERSON_MIN_SIZE
-        )
+        Faces only need to be searched for where something moved, or where a face
+        is currently being held, so the face detector can skip the rest of the frame.
+        
+        Args:
+            motion_areas (list): Motion rectangles in camera frame coordinates
+            scale (float): Detection frame scale returned by prepare_detection_frame
+            frame_shape (tuple): Shape of the detection frame
+            
+        Returns:
+            tuple: Padded (x, y, w, h) union of the areas, or None if there are none
+        """
+        areas = list(motion_areas)
+        if self.face_frames_count > 0:
+            areas.extend(self.last_faces)
+        if not areas:
+            return None
         
-        return len(people) > 0, people
+        boxes = np.asarray(areas, dtype=np.float64) * scale
+        frame_height, frame_width = frame_shape[:2]
+        x1 = max(0, int(boxes[:, 0].min()) - FACE_ROI_PADDING)
+        y1 = max(0, int(boxes[:, 1].min()) - FACE_ROI_PADDING)
+        x2 = min(frame_width, int((boxes[:, 0] + boxes[:, 2]).max()) + FACE_ROI_PADDING)
+        y2 = min(frame_height, int((boxes[:, 1] + boxes[:, 3]).max()) + FACE_ROI_PADDING)
+        return x1, y1, x2 - x1, y2 - y1
     
-    def detect_person_with_persistence(self, frame):
+    def detect_person_with_persistence(self, frame, scale=1.0, motion_areas=()):
         """
         Detect faces with frame skipping and result persistence for performance.
         
         Runs face detection every N frames and persists the result for smooth display.
-        This reduces CPU usage while maintaining responsive face detection.
+        This reduces CPU usage while maintaining responsive face detection. Detection
+        runs on a background worker, the latest finished result is picked up on the
+        next call so the capture loop never waits for the face detector.
+        
+        Only the region around motion and held faces is searched, with a whole
+        frame scan every FACE_FULL_SCAN_INTERVAL detections to find faces that
+        appeared without moving.
         
         Args:
-            frame (numpy.ndarray): Input frame from camera
+            frame (numpy.ndarray): Detection frame - BGR for YuNet, grayscale for Haar
+            scale (float): Detection frame scale returned by prepare_detection_frame
+            motion_areas (list): Motion rectangles in camera frame coordinates
             
         Returns:
             tuple: (person_detected, people_rectangles)
                 - person_detected (bool): True if faces detected (with persistence)
                 - people_rectangles (list): List of (x,y,w,h) detection rectangles
         """
-        self.face_detection_counter += 1
-        
-        # Run actual face detection every N frames
-        if self.face_detection_counter >= FACE_DETECTION_INTERVAL:
-            self.face_detection_counter = 0
-            face_detected, faces = self.detect_person(frame)
+        # Pick up the result of a finished background face detection
+        if self.face_future is not None and self.face_future.done():
+            face_detected, faces = self.face_future.result()
+            self.face_future = None
             
             if face_detected:
                 # Face found - reset persistence counter and store result
                 self.face_frames_count = self.face_hold_frames
-                self.last_face_result = (True, faces)
-                return True, faces
-            else:
+                self.last_faces = faces
+            elif self.face_frames_count <= 0:
                 # No face found - but don't immediately clear if we were persisting
-                if self.face_frames_count <= 0:
-                    self.last_face_result = (False, [])
+                self.last_faces = []
+        
+        self.face_detection_counter += 1
+        
+        # Start face detection every N frames unless the previous one is still running
+        if self.face_detection_counter >= self.face_detection_interval and self.face_future is None:
+            self.face_detection_counter = 0
+            self.face_full_scan_counter += 1
+            
+            # Face size limit comes from the whole frame, not the searched region
+            max_size = (frame.shape[1] // PERSON_MAX_SIZE_FRACTION,
+                        frame.shape[0] // PERSON_MAX_SIZE_FRACTION)
+            
+            region = self.face_search_region(motion_areas, scale, frame.shape)
+            if self.face_full_scan_counter >= FACE_FULL_SCAN_INTERVAL:
+                self.face_full_scan_counter = 0
+                self.face_future = self.face_executor.submit(
+                    self.detect_person, frame.copy(), scale, (0, 0), max_size
+                )
+            elif region is not None:
+                x, y, w, h = region
+                self.face_future = self.face_executor.submit(
+                    self.detect_person, frame[y:y + h, x:x + w].copy(), scale, (x, y), max_size
+                )
         
         # Check if we should persist previous face detection
         if self.face_frames_count > 0:
             self.face_frames_count -= 1
             # Return the persisted result with the original face rectangles
-            return self.last_face_result
-        else:
-            return False, []
+            return True, self.last_faces
+        return False, []
+    
+    def update_detection_intervals(self, gray):
+        """
+        Adapt the motion and face detection intervals to the scene velocity.
+        
+        The relative L1 difference between this frame and the one two frames
+        earlier is a cheap estimate of how fast the scene is changing. A still
+        scene runs the detectors every MOTION_DETECTION_INTERVAL and
+        FACE_DETECTION_INTERVAL frames, any movement brings them closer to
+        running on every frame.
+        
+        Args:
+            gray (numpy.ndarray): Grayscale detection frame
+        """
+        # Start over when the stream resolution changes
+        if self.previous_grays and self.previous_grays[0].shape != gray.shape:
+            self.previous_grays = []
+        
+        if len(self.previous_grays) == 2:
+            reference = self.previous_grays.pop(0)
+            velocity = cv2.norm(gray, reference, cv2.NORM_L1) / (cv2.norm(reference, cv2.NORM_L1) + 1e-6)
+            slowdown = 1 + SCENE_VELOCITY_GAIN * velocity
+            self.motion_detection_interval = max(1, int(MOTION_DETECTION_INTERVAL / slowdown))
+            self.face_detection_interval = max(1, int(FACE_DETECTION_INTERVAL / slowdown))
+        self.previous_grays.append(gray)
+    
+    def draw_text(self, frame, text, origin, font_scale, color, thickness):
+        """
+        Draw text like cv2.putText, reusing a cached pre-rendered sprite.
+        
+        putText rasterizes every glyph on each call, so each distinct label is
+        rendered once into a colour sprite and mask, then copied onto the frame.
+        
+        Args:
+            frame (numpy.ndarray): Frame to draw on, modified in place
+            text (str): Text to draw
+            origin (tuple): Bottom-left (x, y) corner of the text, as for putText
+            font_scale (float): Font scale factor
+            color (tuple): Text colour (BGR)
+            thickness (int): Stroke thickness
+        """
+        key = (text, font_scale, color, thickness)
+        overlay = self.text_overlays.get(key)
+        if overlay is None:
+            (width, height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+            pad = thickness + 1
+            mask = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+            cv2.putText(mask, text, (pad, height + pad), cv2.FONT_HERSHEY_SIMPLEX, font_scale, 255, thickness)
+            sprite = np.full(mask.shape + (3,), color, dtype=np.uint8)
+            overlay = (sprite, mask, (pad, height + pad))
+            self.text_overlays[key] = overlay
+        sprite, mask, (anchor_x, anchor_y) = overlay
+        
+        # Clip the sprite to the frame
+        x, y = origin[0] - anchor_x, origin[1] - anchor_y
+        x1, y1 = max(x, 0), max(y, 0)
+        x2 = min(x + sprite.shape[1], frame.shape[1])
+        y2 = min(y + sprite.shape[0], frame.shape[0])
+        if x1 >= x2 or y1 >= y2:
+            return
+        cv2.copyTo(sprite[y1 - y:y2 - y, x1 - x:x2 - x], mask[y1 - y:y2 - y, x1 - x:x2 - x],
+                   frame[y1:y2, x1:x2])
     
     def cleanup(self):
         """
         Clean up camera resources.
         
-        Releases the RTSP video capture object to free system resources.
-        Should be called when detection is finished.
+        Stops the frame reader and face detection worker, and releases the RTSP
+        video capture object to free system resources. Should be called when
+        detection is finished.
         """
-        if self.cap is not None:
+        self.reader_stop.set()
+        if self.reader_thread is not None:
+            # The reader releases the capture itself once its current read returns
+            self.reader_thread.join(timeout=FRAME_TIMEOUT)
+        elif self.cap is not None:
             self.cap.release()
+        self.face_executor.shutdown(wait=True)
     
     def run_detection(self, display=False, save_detections=False):
         """
@@ -273,30 +641,46 @@ class PTZMotionDetector:
         print(f"Starting PTZOptics motion detection for camera at {self.camera_ip}")
         print("Press 'q' to quit the display window")
         
-        frame_count = 0
-        
         while True:
             frame = self.get_camera_frame()
             if frame is None:
-                print("Failed to get frame, retrying in 2 seconds...")
-                time.sleep(2)
+                print("No new frame from camera, waiting...")
                 continue
             
-            frame_count += 1
+            # Downscale and convert to grayscale once, shared by both detectors,
+            # writing into the oldest of the rotating grayscale buffers
+            detection_frame, scale = self.prepare_detection_frame(frame)
+            self.gray_index = (self.gray_index + 1) % len(self.gray_buffers)
+            gray = cv2.cvtColor(detection_frame, cv2.COLOR_BGR2GRAY,
+                                dst=self.gray_buffers[self.gray_index])
+            self.gray_buffers[self.gray_index] = gray
             
-            # Detect motion
-            raw_motion_detected, motion_areas, fg_mask = self.detect_motion(frame)
+            # Detect motion - run MOG2 more often the faster the scene changes
+            # and reuse the last result on the frames in between
+            self.update_detection_intervals(gray)
+            self.motion_detection_counter += 1
+            if self.motion_detection_counter >= self.motion_detection_interval:
+                self.motion_detection_counter = 0
+                self.last_motion_result = self.detect_motion(gray, scale)
+            raw_motion_detected, motion_areas, fg_mask = self.last_motion_result
             
-            # Apply smoothing to motion detection
-            motion_detected = self.smooth_motion_detection(raw_motion_detected)
+            # Hold the motion state for a few frames to reduce flickering
+            motion_detected = raw_motion_detected or self.motion_frames_count > 0
+            if raw_motion_detected:
+                self.motion_frames_count = self.motion_hold_frames
+            elif self.motion_frames_count > 0:
+                self.motion_frames_count -= 1
             
             # Check for faces with frame skipping and persistence (runs independently of motion)
-            person_detected, people = self.detect_person_with_persistence(frame)
+            face_frame = detection_frame if self.face_net is not None else gray
+            person_detected, people = self.detect_person_with_persistence(face_frame, scale, motion_areas)
             
             
             # Display if requested
             if display:
-                display_frame = frame.copy()
+                # The reader hands each frame out only once and detection is done
+                # with it, so annotate it in place instead of copying it
+                display_frame = frame
                 
                 # Draw motion detection areas in green
                 for (x, y, w, h) in motion_areas:
@@ -305,8 +689,7 @@ class PTZMotionDetector:
                 # Draw face detections in red
                 for (x, y, w, h) in people:
                     cv2.rectangle(display_frame, (x, y), (x + w, y + h), PERSON_COLOR, 2)
-                    cv2.putText(display_frame, "Face", (x, y - 10), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, PERSON_COLOR, 2)
+                    self.draw_text(display_frame, "Face", (x, y - 10), 0.5, PERSON_COLOR, 2)
                 
                 # Draw status indicator circle (red/green light)
                 indicator_color = GREEN_LIGHT if motion_detected else RED_LIGHT
@@ -320,21 +703,17 @@ class PTZMotionDetector:
                 # Display detection status text
                 status = "MOTION + FACE" if (motion_detected and person_detected) else \
                         "MOTION DETECTED" if motion_detected else "NO MOTION"
-                cv2.putText(display_frame, status, (STATUS_INDICATOR_POSITION[0] + 40, STATUS_INDICATOR_POSITION[1] + 5), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.8, STATUS_COLOR, 2)
+                self.draw_text(display_frame, status, (STATUS_INDICATOR_POSITION[0] + 40, STATUS_INDICATOR_POSITION[1] + 5),
+                               0.8, STATUS_COLOR, 2)
                 
                 # Add quit instruction at bottom of frame
                 frame_height = display_frame.shape[0]
-                cv2.putText(display_frame, "Press 'q' to quit", (10, frame_height - 15), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                self.draw_text(display_frame, "Press 'q' to quit", (10, frame_height - 15), 0.5, (255, 255, 255), 1)
                 
                 cv2.imshow("PTZOptics Motion Detection", display_frame)
                 
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
-            
-            # Brief pause to prevent excessive CPU usage
-            time.sleep(0.01)
         
         self.cleanup()
         if display:
@@ -358,6 +737,8 @@ def main():
                        help=f'Minimum motion area in pixels (default: {DEFAULT_MIN_AREA})')
     parser.add_argument('--stream', type=int, default=2, choices=[1, 2],
                        help='Camera stream to use: 1 for higher quality, 2 for lower latency (default: 2)')
+    parser.add_argument('--face-model', default=FACE_MODEL_PATH,
+                       help=f'YuNet ONNX face model, Haar cascade is used if missing (default: {FACE_MODEL_PATH})')
     
     args = parser.parse_args()
     
@@ -365,7 +746,8 @@ def main():
         camera_ip=args.camera_ip,
         sensitivity=args.sensitivity,
         min_area=args.min_area,
-        stream=f"stream{args.stream}"
+        stream=f"stream{args.stream}",
+        face_model=args.face_model
     )
     
     try:
@@ -9,43 +9,60 @@ Usage:
     python ptz_visca_example.py
 
 Requirements:
-    - Python 3.6+
+    - Python 3.7+
     - PTZOptics camera on network
     - Camera IP address or hostname configured below
 """
 
+import asyncio
 import socket
-import time
-import threading
-import signal
 import sys
 
 # Configuration
 CAMERA_HOST = "192.168.1.100"  # Replace with your camera's IP address
 CAMERA_PORT = 5678
+COMMAND_INTERVAL = 5  # Seconds between commands
 
 class PTZOpticsVISCAController:
+    # Messages for ACK and completion replies (camera address 1)
+    RESPONSE_MESSAGES = {
+        0x41: "✓ Command acknowledged",
+        0x51: "✅ Command completed",
+    }
+    
+    # Messages for the error code carried by 90 60 replies
+    ERROR_MESSAGES = {
+        0x02: "Syntax error",
+        0x03: "Command buffer full",
+        0x04: "Command cancelled",
+        0x05: "No socket",
+        0x41: "Command not executable"
+    }
+    
     def __init__(self, host="ptzoptics.local", port=5678):
         self.host = host
         self.port = port
-        self.socket = None
+        self.reader = None
+        self.writer = None
+        self.replies = None
+        self.reader_task = None
         self.running = False
         self.command_index = 0
-        self.timer_thread = None
+        self.timer_task = None
         
         # VISCA Command List - Add or modify commands here
         self.visca_commands = [
             # Pan Left (medium speed: pan=0x08, tilt=0x08)
-            [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x01, 0x03, 0xFF],
+            b"\x81\x01\x06\x01\x08\x08\x01\x03\xFF",
             
             # Stop Pan/Tilt
-            [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x03, 0x03, 0xFF],
+            b"\x81\x01\x06\x01\x08\x08\x03\x03\xFF",
             
             # Pan Right (medium speed: pan=0x08, tilt=0x08)
-            [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x02, 0x03, 0xFF],
+            b"\x81\x01\x06\x01\x08\x08\x02\x03\xFF",
             
             # Stop Pan/Tilt
-            [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x03, 0x03, 0xFF],
+            b"\x81\x01\x06\x01\x08\x08\x03\x03\xFF",
         ]
         
         # Command descriptions for logging
@@ -55,163 +72,272 @@ class PTZOpticsVISCAController:
             "Pan Right", 
             "Stop Pan/Tilt"
         ]
+        
+        # Convert commands to bytes (if given as lists) and hex once instead of on every send
+        self.command_bytes = [bytes(command) for command in self.visca_commands]
+        self.command_hex = [" ".join(f"{b:02X}" for b in command) for command in self.command_bytes]
     
-    def connect(self):
+    async def connect(self):
         """Establish TCP connection to the PTZ camera"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(10)  # 10 second timeout
-            self.socket.connect((self.host, self.port))
-            print(f"✓ Connected to PTZ camera at {self.host}:{self.port}")
-            return True
-        except socket.error as e:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=10  # 10 second timeout
+            )
+        except asyncio.TimeoutError:
+            print("❌ Connection failed: timed out")
+            return False
+        except OSError as e:
             print(f"❌ Connection failed: {e}")
             return False
+        
+        # Send each small VISCA packet immediately instead of letting Nagle's
+        # algorithm hold it back, and let the OS detect a dead connection
+        sock = self.writer.get_extra_info("socket")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        
+        # Collect replies in the background so they can be read without blocking
+        self.replies = asyncio.Queue()
+        self.reader_task = asyncio.create_task(self.read_replies())
+        print(f"✓ Connected to PTZ camera at {self.host}:{self.port}")
+        return True
     
-    def disconnect(self):
+    async def disconnect(self):
         """Close the connection"""
-        if self.socket:
-            self.socket.close()
-            self.socket = None
+        if self.writer:
+            self.reader_task.cancel()
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = None
+            self.writer = None
             print("Connection closed")
     
-    def send_command(self, command):
-        """Send a VISCA command and wait for response"""
-        if not self.socket:
-            print("❌ No connection available")
+    async def read_replies(self):
+        """Queue every VISCA reply from the camera, each ends with 0xFF"""
+        try:
+            while True:
+                self.replies.put_nowait(await self.reader.readuntil(b"\xff"))
+        except (asyncio.IncompleteReadError, OSError):
+            # Wake up a command waiting for a reply
+            self.replies.put_nowait(None)
+    
+    async def next_reply(self, timeout=None):
+        """Return the next queued reply, waiting up to timeout seconds for one
+
+        Returns:
+            The reply packet, or None if no reply arrived in time
+        """
+        if timeout is None:
+            if self.replies.empty():
+                return None
+            reply = self.replies.get_nowait()
+        else:
+            try:
+                reply = await asyncio.wait_for(self.replies.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if reply is None:
+            self.replies.put_nowait(None)
+            raise ConnectionError("Connection closed by camera")
+        return reply
+    
+    async def send_command(self, command, hex_string=None, output=None):
+        """Send a VISCA command and wait for response
+
+        Args:
+            command: Command bytes, or a list of byte values
+            hex_string: Precomputed hex of the command for logging
+            output: List to collect the log lines in, they are printed when the
+                    command finishes if not given
+        """
+        lines = [] if output is None else output
+        try:
+            return await self.send_command_logged(command, hex_string, lines)
+        finally:
+            # One write per command instead of one per line
+            if output is None and lines:
+                print("\n".join(lines))
+    
+    async def send_command_logged(self, command, hex_string, lines):
+        """Send a VISCA command, adding its log lines to lines"""
+        if not self.writer:
+            lines.append("❌ No connection available")
             return False
         
         try:
+            # Report replies that arrived since the last command, such as
+            # the completion of a movement, without waiting for any
+            response = await self.next_reply()
+            while response is not None:
+                lines.extend(self.format_response(response, label="Earlier response"))
+                response = await self.next_reply()
+            
             # Convert command to bytes and send
             command_bytes = bytes(command)
-            hex_string = " ".join([f"{b:02X}" for b in command_bytes])
-            print(f"   Hex: {hex_string}")
+            if hex_string is None:
+                hex_string = " ".join([f"{b:02X}" for b in command_bytes])
+            lines.append(f"   Hex: {hex_string}")
             
-            self.socket.send(command_bytes)
+            self.writer.write(command_bytes)
+            await self.writer.drain()
             
-            # Wait for response
-            response = self.socket.recv(16)
-            if response:
-                response_hex = " ".join([f"{b:02X}" for b in response])
-                print(f"   Response: {response_hex}")
-                self.interpret_response(response)
+            # Wait for the ACK, error or inquiry reply to this command only,
+            # a completion that follows is reported on the next send
+            while True:
+                response = await self.next_reply(timeout=10)
+                if response is None:
+                    lines.append("   ⚠️ No response from camera")
+                    break
+                lines.extend(self.format_response(response))
+                if self.is_command_reply(response):
+                    break
             
             return True
             
-        except socket.error as e:
-            print(f"❌ Send error: {e}")
+        except OSError as e:
+            lines.append(f"❌ Send error: {e}")
             return False
     
+    def is_command_reply(self, response):
+        """Check if a reply answers the last command (ACK, error or inquiry data)"""
+        if len(response) < 3:
+            return False
+        reply_type = response[1] & 0xF0
+        return reply_type in (0x40, 0x60) or (reply_type == 0x50 and len(response) > 3)
+    
+    def format_response(self, response, label="Response"):
+        """Return the log lines for a VISCA reply and its meaning"""
+        response_hex = " ".join([f"{b:02X}" for b in response])
+        lines = [f"   {label}: {response_hex}"]
+        meaning = self.interpret_response(response)
+        if meaning:
+            lines.append(meaning)
+        return lines
+    
     def interpret_response(self, response):
-        """Interpret VISCA response codes"""
+        """Interpret VISCA response codes
+
+        Returns:
+            A description of the reply, or None for replies too short to interpret
+        """
         if len(response) < 3:
-            return
+            return None
         
         if response[0] == 0x90:
-            if response[1] == 0x41:  # ACK (camera address 1)
-                print("   ✓ Command acknowledged")
-            elif response[1] == 0x51:  # Completion (camera address 1)
-                print("   ✅ Command completed")
+            message = self.RESPONSE_MESSAGES.get(response[1])
+            if message:
+                return f"   {message}"
             elif response[1] == 0x60:
                 error_code = response[2]
-                error_messages = {
-                    0x02: "Syntax error",
-                    0x03: "Command buffer full",
-                    0x04: "Command cancelled",
-                    0x05: "No socket",
-                    0x41: "Command not executable"
-                }
-                error_msg = error_messages.get(error_code, f"Unknown error: {error_code:02X}")
-                print(f"   ❌ {error_msg}")
+                error_msg = self.ERROR_MESSAGES.get(error_code, f"Unknown error: {error_code:02X}")
+                return f"   ❌ {error_msg}"
             else:
-                print("   ⚠️ Unknown response type")
+                return "   ⚠️ Unknown response type"
+        return None
     
-    def send_next_command(self):
+    async def send_next_command(self):
         """Send the next command in the cycle"""
         if not self.visca_commands:
             print("⚠️ No commands in command list")
             return
         
-        command = self.visca_commands[self.command_index]
         description = (self.command_descriptions[self.command_index] 
                       if self.command_index < len(self.command_descriptions) 
                       else f"Command {self.command_index + 1}")
         
-        print(f"\n📤 Sending: {description}")
-        self.send_command(command)
+        output = [f"\n📤 Sending: {description}"]
+        await self.send_command(self.command_bytes[self.command_index], self.command_hex[self.command_index], output)
+        print("\n".join(output))
         
         # Move to next command (cycle through the list)
         self.command_index = (self.command_index + 1) % len(self.visca_commands)
     
-    def command_timer(self):
-        """Timer function that sends commands every 5 seconds"""
+    async def command_timer(self):
+        """Timer task that sends the next command every COMMAND_INTERVAL seconds"""
+        # Wait for absolute deadlines so the time spent sending doesn't add drift
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
         while self.running:
-            if self.socket:
-                self.send_next_command()
-            time.sleep(5)  # 5 second interval
-    
-    def start(self):
+            if self.writer:
+                await self.send_next_command()
+            next_tick += COMMAND_INTERVAL
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # Sending overran the interval, start counting again from now
+                next_tick = loop.time()
+        
+    async def start(self):
         """Start the controller"""
-        if self.connect():
+        if await self.connect():
             self.running = True
-            self.timer_thread = threading.Thread(target=self.command_timer, daemon=True)
-            self.timer_thread.start()
-            print("🕒 Started command timer (5 second intervals)")
+            self.timer_task = asyncio.create_task(self.command_timer())
+            print(f"🕒 Started command timer ({COMMAND_INTERVAL} second intervals)")
             return True
         return False
     
-    def stop(self):
+    async def stop(self):
         """Stop the controller"""
         self.running = False
-        if self.timer_thread:
-            self.timer_thread.join(timeout=1)
-        self.disconnect()
+        if self.timer_task:
+            # Wakes the timer immediately, even in the middle of its wait
+            self.timer_task.cancel()
+            try:
+                await self.timer_task
+            except asyncio.CancelledError:
+                pass
+        await self.disconnect()
         print("⏹️ Controller stopped")
     
-    def send_single_command(self, index):
+    async def send_single_command(self, index):
         """Send a single command by index"""
         if 0 <= index < len(self.visca_commands):
-            command = self.visca_commands[index]
             description = (self.command_descriptions[index] 
                           if index < len(self.command_descriptions) 
                           else f"Command {index + 1}")
             
-            print(f"\n📤 Manual send: {description}")
-            self.send_command(command)
+            output = [f"\n📤 Manual send: {description}"]
+            await self.send_command(self.command_bytes[index], self.command_hex[index], output)
+            print("\n".join(output))
         else:
             print(f"❌ Invalid command index: {index}")
 
-def signal_handler(sig, frame):
-    """Handle Ctrl+C gracefully"""
-    print("\n\n🛑 Stopping PTZ Controller...")
-    controller.stop()
-    sys.exit(0)
-
-def main():
-    global controller
-    
+async def amain():
+    """Run the controller until Ctrl+C cancels it"""
     # Create controller instance
     controller = PTZOpticsVISCAController(host=CAMERA_HOST, port=CAMERA_PORT)
     
-    # Set up signal handler for graceful shutdown
-    signal.signal(signal.SIGINT, signal_handler)
-    
     print("PTZOptics VISCA Controller Example")
     print("=" * 40)
     print(f"Connecting to camera at: {controller.host}")
-    print("Commands will be sent every 5 seconds")
+    print(f"Commands will be sent every {COMMAND_INTERVAL} seconds")
     print("Press Ctrl+C to stop\n")
     
     # Start the controller
-    if controller.start():
-        try:
-            # Keep the program running
-            while True:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            signal_handler(None, None)
-    else:
+    if not await controller.start():
         print("Failed to start controller")
+        return False
+    
+    try:
+        # Keep the program running
+        await controller.timer_task
+    finally:
+        # Ctrl+C cancels this coroutine, stop the controller gracefully
+        print("\n\n🛑 Stopping PTZ Controller...")
+        await controller.stop()
+    return True
+
+def main():
+    try:
+        started = asyncio.run(amain())
+    except KeyboardInterrupt:
+        # amain() has already stopped the controller
+        sys.exit(0)
+    if not started:
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -220,21 +346,21 @@ if __name__ == "__main__":
 """
 HOW TO ADD MORE COMMANDS:
 
-1. Add command byte arrays to the 'visca_commands' list
+1. Add command bytes to the 'visca_commands' list (lists of byte values also work)
 2. Add corresponding descriptions to 'command_descriptions' list
 
 Example commands from the PTZOptics VISCA documentation:
 
 Pan/Tilt Commands:
-- Pan Right:     [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x02, 0x03, 0xFF]
-- Tilt Up:       [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x03, 0x01, 0xFF]
-- Tilt Down:     [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x03, 0x02, 0xFF]
-- Up-Left:       [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x01, 0x01, 0xFF]
-- Up-Right:      [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x02, 0x01, 0xFF]
-- Down-Left:     [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x01, 0x02, 0xFF]
-- Down-Right:    [0x81, 0x01, 0x06, 0x01, 0x08, 0x08, 0x02, 0x02, 0xFF]
-- Home Position: [0x81, 0x01, 0x06, 0x04, 0xFF]
-- Reset:         [0x81, 0x01, 0x06, 0x05, 0xFF]
+- Pan Right:     b"\x81\x01\x06\x01\x08\x08\x02\x03\xFF"
+- Tilt Up:       b"\x81\x01\x06\x01\x08\x08\x03\x01\xFF"
+- Tilt Down:     b"\x81\x01\x06\x01\x08\x08\x03\x02\xFF"
+- Up-Left:       b"\x81\x01\x06\x01\x08\x08\x01\x01\xFF"
+- Up-Right:      b"\x81\x01\x06\x01\x08\x08\x02\x01\xFF"
+- Down-Left:     b"\x81\x01\x06\x01\x08\x08\x01\x02\xFF"
+- Down-Right:    b"\x81\x01\x06\x01\x08\x08\x02\x02\xFF"
+- Home Position: b"\x81\x01\x06\x04\xFF"
+- Reset:         b"\x81\x01\x06\x05\xFF"
 
 Speed Parameters:
 - Pan speed: 0x01 (slow) to 0x18 (fast)
@@ -242,11 +368,11 @@ Speed Parameters:
 - Medium speed: 0x08 (commonly used)
 
 Preset Commands:
-- Save Preset 1:   [0x81, 0x01, 0x04, 0x3F, 0x01, 0x01, 0xFF]
-- Recall Preset 1: [0x81, 0x01, 0x04, 0x3F, 0x02, 0x01, 0xFF]
+- Save Preset 1:   b"\x81\x01\x04\x3F\x01\x01\xFF"
+- Recall Preset 1: b"\x81\x01\x04\x3F\x02\x01\xFF"
 
 Configuration:
 - Change camera IP in the main() function
-- Modify the 5-second interval in command_timer()
+- Modify COMMAND_INTERVAL to change the 5-second interval
 - Add error handling or logging as needed
 """
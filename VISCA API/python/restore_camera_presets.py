@@ -53,6 +53,10 @@ class PTZOpticsVISCAController:
         """Establish TCP connection to the PTZ camera"""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Send each small VISCA packet immediately instead of letting Nagle's
+            # algorithm hold it back, and let the OS detect a dead connection
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             self.socket.settimeout(TIMEOUT)
             self.socket.connect((self.host, self.port))
 
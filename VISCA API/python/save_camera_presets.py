@@ -2,13 +2,31 @@
 PTZOptics VISCA Preset Position Query
 """
 
+import itertools
 import json
+import os
 import socket
 import sys
 import time
+from pathlib import Path
 
 TIMEOUT = 10  # Seconds
 
+# Position inquiries, sent back to back so one round trip returns all replies
+PAN_TILT_INQUIRY = bytes([0x81, 0x09, 0x06, 0x12, 0xFF])
+ZOOM_INQUIRY = bytes([0x81, 0x09, 0x04, 0x47, 0xFF])
+FOCUS_INQUIRY = bytes([0x81, 0x09, 0x04, 0x48, 0xFF])
+VERSION_INQUIRY = bytes([0x81, 0x09, 0x00, 0x02, 0xFF])
+
+# Positions captured on earlier runs, per camera and preset
+PRESET_CACHE_PATH = Path.home() / ".ptz_preset_cache.json"
+
+# Movement is complete once SETTLE_SAMPLES positions in a row, polled every
+# SETTLE_POLL_INTERVAL seconds, differ by at most SETTLE_THRESHOLD steps
+SETTLE_POLL_INTERVAL = 0.1  # Seconds
+SETTLE_THRESHOLD = 2
+SETTLE_SAMPLES = 3
+
 
 # PTZOptics Blue: #93cce8 -> RGB(147, 206, 232)
 class Colors:
@@ -41,16 +59,71 @@ def print_banner():
     print(banner)
 
 
+def position_values(position):
+    """Convert a position dict to a tuple of ints, in pan, tilt, zoom, focus order
+
+    Returns None if pan, tilt or zoom is missing.
+    """
+    try:
+        values = [int(position[axis], 16) for axis in ("pan", "tilt", "zoom")]
+    except KeyError:
+        return None
+    if "focus" in position:
+        values.append(int(position["focus"], 16))
+    return tuple(values)
+
+
+def position_distance(a, b):
+    """Return the largest per-axis difference between two position tuples
+
+    Positions are 16-bit VISCA values, so differences wrap around (FFFF is next
+    to 0000). Returns None if either position is missing or they don't report
+    the same axes.
+    """
+    if a is None or b is None or len(a) != len(b):
+        return None
+    distance = 0
+    for value_a, value_b in zip(a, b):
+        delta = (value_a - value_b) & 0xFFFF
+        distance = max(distance, min(delta, 0x10000 - delta))
+    return distance
+
+
+def load_preset_cache():
+    """Load cached preset positions, or return an empty cache"""
+    try:
+        with open(PRESET_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_preset_cache(cache):
+    """Write the preset cache, replacing the old file in one step"""
+    temp_path = PRESET_CACHE_PATH.with_name(PRESET_CACHE_PATH.name + ".tmp")
+    try:
+        with open(temp_path, "w") as f:
+            f.write(json.dumps(cache, indent=2))
+        os.replace(temp_path, PRESET_CACHE_PATH)
+    except OSError as e:
+        print(f"Could not update preset cache {PRESET_CACHE_PATH}: {e}")
+
+
 class PTZOpticsVISCAController:
     def __init__(self, host, port=5678):
         self.host = host
         self.port = port
         self.socket = None
+        self.buffer = bytearray()
 
     def connect(self):
         """Establish TCP connection to the PTZ camera"""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Send each small VISCA packet immediately instead of letting Nagle's
+            # algorithm hold it back, and let the OS detect a dead connection
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             self.socket.settimeout(TIMEOUT)
             self.socket.connect((self.host, self.port))
 
@@ -83,13 +156,41 @@ class PTZOpticsVISCAController:
         try:
             command_bytes = bytes(command)
             self.socket.send(command_bytes)
-            response = self.socket.recv(16)
+            response = self.read_packet()
             return response
         except socket.error as e:
             print(f"Send error: {e}")
             return None
 
+    def read_packet(self):
+        """Read one VISCA packet, which always ends with 0xFF"""
+        while 0xFF not in self.buffer:
+            data = self.socket.recv(1024)
+            if not data:
+                raise socket.error("Connection closed by camera")
+            self.buffer += data
+        end = self.buffer.index(0xFF) + 1
+        packet = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        return packet
+
+    def read_inquiry_reply(self):
+        """Read the next inquiry reply, skipping ACK and completion packets
+
+        Returns:
+            The reply packet, or None if the camera answered with an error
+        """
+        while True:
+            packet = self.read_packet()
+            if len(packet) < 3:
+                continue
+            if packet[1] & 0xF0 == 0x60:
+                return None
+            if packet[1] == 0x50 and len(packet) > 3:
+                return packet
+
     def clear_buffer(self):
+        self.buffer.clear()
         self.socket.setblocking(False)
         try:
             while self.socket.recv(1024):
@@ -99,6 +200,26 @@ class PTZOpticsVISCAController:
         self.socket.setblocking(True)
         self.socket.settimeout(TIMEOUT)
 
+    def send_inquiry(self, inquiry):
+        """Send a single inquiry and return its reply, or None on failure"""
+        try:
+            self.socket.sendall(inquiry)
+            return self.read_inquiry_reply()
+        except socket.error as e:
+            print(f"Inquiry error: {e}")
+            return None
+
+    def get_camera_id(self):
+        """Identify the camera from its vendor, model and ROM version
+
+        Returns:
+            A string such as "0001-0511-0102", or None if the camera didn't answer
+        """
+        response = self.send_inquiry(VERSION_INQUIRY)
+        if not response or len(response) < 8:
+            return None
+        return "-".join(response[i : i + 2].hex().upper() for i in (2, 4, 6))
+
     def go_home(self):
         """Move camera to HOME position"""
         command = [0x81, 0x01, 0x06, 0x04, 0xFF]
@@ -132,10 +253,23 @@ class PTZOpticsVISCAController:
         """
         position = {}
 
+        # Send every inquiry at once and read the replies, which come back in order
+        inquiries = [PAN_TILT_INQUIRY, ZOOM_INQUIRY]
+        if capture_focus:
+            inquiries.append(FOCUS_INQUIRY)
+        try:
+            self.socket.sendall(b"".join(inquiries))
+            replies = [self.read_inquiry_reply() for _ in inquiries]
+        except socket.error as e:
+            # Fall back to one inquiry at a time, for cameras that drop back-to-back inquiries
+            print(f"Position inquiry error: {e}, retrying inquiries one at a time...")
+            self.clear_buffer()
+            replies = [self.send_inquiry(inquiry) for inquiry in inquiries]
+
         # Pan/Tilt Inquiry with retry
+        response = replies[0]
         for attempt in range(3):
-            response = self.send_command([0x81, 0x09, 0x06, 0x12, 0xFF])
-            if response and len(response) >= 11 and response[1] == 0x50:
+            if response and len(response) >= 11:
                 pan = (
                     (response[2] << 12)
                     | (response[3] << 8)
@@ -151,13 +285,14 @@ class PTZOpticsVISCAController:
                 position["pan"] = f"{pan:04X}"
                 position["tilt"] = f"{tilt:04X}"
                 break
-            else:
+            elif attempt < 2:
                 print(f"Pan/Tilt inquiry attempt {attempt + 1} failed, retrying...")
                 time.sleep(0.2)
+                response = self.send_inquiry(PAN_TILT_INQUIRY)
 
         # Zoom Inquiry
-        response = self.send_command([0x81, 0x09, 0x04, 0x47, 0xFF])
-        if response and len(response) >= 7 and response[1] == 0x50:
+        response = replies[1]
+        if response and len(response) >= 7:
             zoom = (
                 (response[2] << 12)
                 | (response[3] << 8)
@@ -168,8 +303,8 @@ class PTZOpticsVISCAController:
 
         # Focus Inquiry (optional)
         if capture_focus:
-            response = self.send_command([0x81, 0x09, 0x04, 0x48, 0xFF])
-            if response and len(response) >= 7 and response[1] == 0x50:
+            response = replies[2]
+            if response and len(response) >= 7:
                 focus = (
                     (response[2] << 12)
                     | (response[3] << 8)
@@ -180,6 +315,58 @@ class PTZOpticsVISCAController:
 
         return position
 
+    def wait_until_settled(
+        self,
+        capture_focus=True,
+        timeout=10,
+        target=None,
+        threshold=SETTLE_THRESHOLD,
+        poll=SETTLE_POLL_INTERVAL,
+        position=None,
+    ):
+        """Poll the position until the camera stops moving
+
+        Args:
+            capture_focus: If True, include focus when comparing positions
+            timeout: Maximum seconds to wait for the movement to finish
+            target: If given, wait until the camera is within threshold of this position instead
+            threshold: Largest position change between samples that still counts as stopped
+            poll: Seconds between position samples
+            position: A position the caller has just sampled, used as the first sample
+                      instead of querying the camera again
+
+        Returns:
+            The last sampled position
+        """
+        deadline = time.monotonic() + timeout
+        # Each sample is parsed once, the target only once per wait
+        target_values = position_values(target) if target is not None else None
+        previous_values = None
+        stable_samples = 0
+        while True:
+            if position is None:
+                position = self.get_position(capture_focus=capture_focus)
+            values = position_values(position)
+            if target is not None:
+                distance = position_distance(values, target_values)
+                if distance is not None and distance <= threshold:
+                    return position
+            else:
+                distance = position_distance(values, previous_values)
+                if distance is not None and distance <= threshold:
+                    stable_samples += 1
+                    if stable_samples >= SETTLE_SAMPLES - 1:
+                        return position
+                else:
+                    stable_samples = 0
+                previous_values = values
+
+            if time.monotonic() + poll > deadline:
+                print(f"Movement not finished after {timeout} seconds, using last position")
+                return position
+            time.sleep(poll)
+            position = None
+
 
 def main():
     print_banner()
@@ -209,10 +396,11 @@ def main():
         print("Timing Configuration")
         print("=" * 65)
         print("⚠️  WARNING: Using less than 10 seconds may cause incomplete movements")
-        print("    Recommended: 10+ seconds for reliable preset capture\n")
+        print("    Recommended: 10+ seconds for reliable preset capture")
+        print("    Presets are captured as soon as the camera stops moving\n")
 
         time_between_str = input(
-            "Seconds to wait for camera movement [default: 10]: "
+            "Maximum seconds to wait for camera movement [default: 10]: "
         ).strip()
         time_between_preset = int(time_between_str) if time_between_str else 10
 
@@ -266,28 +454,75 @@ def main():
         sys.exit(1)
 
     try:
-        # Initialize camera to HOME position with max speed
-        controller.set_max_preset_speed()
-        controller.go_home()
-        print(
-            f"Waiting {time_between_preset} seconds for HOME movement to complete..."
-        )
-        time.sleep(time_between_preset)
-        controller.clear_buffer()
-
-        home_position = controller.get_position(capture_focus=capture_focus)
-        print(f"HOME position captured: {home_position}")
-        if capture_focus:
-            print("(Capturing focus positions)\n")
+        # Positions are cached per camera and by whether focus is included
+        preset_cache = load_preset_cache()
+        camera_id = controller.get_camera_id()
+        cache_key = None
+        cached_positions = {}
+        if camera_id:
+            cache_key = f"{ip_address}:{port}/{camera_id}/{'focus' if capture_focus else 'no-focus'}"
+            cached_positions = preset_cache.get(cache_key, {})
         else:
-            print("(Skipping focus - only capturing Pan/Tilt/Zoom)\n")
+            print("Could not identify camera, preset cache disabled\n")
+
+        use_cache = False
+        if cached_positions:
+            cache_choice = (
+                input(
+                    f"Found {len(cached_positions)} cached presets for this camera. "
+                    "Reuse them? (y = reuse, c = clear cache) [default: n]: "
+                )
+                .strip()
+                .lower()
+            )
+            use_cache = cache_choice == "y"
+            if cache_choice == "c":
+                cached_positions = {}
+                print("Cleared cached presets for this camera")
+            print()
+
+        # Captured before the first preset that isn't cached, so a run served
+        # entirely from the cache never moves the camera
+        home_position = None
 
         all_positions = {}
         skipped_presets = []
 
-        for preset in range(start_preset, end_preset + 1):
-            if 90 <= preset <= 99:
+        # Presets to capture, leaving out the 90-99 special and reserved range
+        presets = itertools.chain(
+            range(start_preset, min(90, end_preset + 1)),
+            range(max(100, start_preset), end_preset + 1),
+        )
+
+        for preset in presets:
+            # Reuse a position from an earlier run, None marks a preset that didn't exist
+            preset_key = f"preset_{preset}"
+            if use_cache and preset_key in cached_positions:
+                if cached_positions[preset_key] is None:
+                    print(f"Preset {preset} did not exist on the last run (cached). Skipping.\n")
+                    skipped_presets.append(preset)
+                else:
+                    all_positions[preset_key] = cached_positions[preset_key]
+                    print(f"Preset {preset} cached: {cached_positions[preset_key]}\n")
                 continue
+
+            if home_position is None:
+                # Initialize camera to HOME position with max speed
+                controller.set_max_preset_speed()
+                controller.go_home()
+                print(
+                    f"Waiting {time_between_preset} seconds for HOME movement to complete..."
+                )
+                time.sleep(time_between_preset)
+                controller.clear_buffer()
+
+                home_position = controller.get_position(capture_focus=capture_focus)
+                print(f"HOME position captured: {home_position}")
+                if capture_focus:
+                    print("(Capturing focus positions)\n")
+                else:
+                    print("(Skipping focus - only capturing Pan/Tilt/Zoom)\n")
+
             controller.recall_preset(preset)
 
             # Brief delay to allow movement to start
@@ -305,29 +540,43 @@ def main():
                     f"Preset {preset} appears to not exist (still at HOME). Skipping.\n"
                 )
                 skipped_presets.append(preset)
+                cached_positions[preset_key] = None
                 continue
 
             # Position changed, wait for full movement to complete
             print(
-                f"Preset {preset} exists. Waiting {time_between_preset} seconds for movement to complete..."
+                f"Preset {preset} exists. Waiting up to {time_between_preset} seconds for movement to complete..."
+            )
+            # The existence check is the first settle sample, and the sample
+            # that showed the camera stopped is the final position
+            position = controller.wait_until_settled(
+                capture_focus=capture_focus,
+                timeout=time_between_preset,
+                position=current_position,
             )
-            time.sleep(time_between_preset)
             controller.clear_buffer()
 
-            # Get final position
-            position = controller.get_position(capture_focus=capture_focus)
-
             # Store result
-            all_positions[f"preset_{preset}"] = position
+            all_positions[preset_key] = position
+            cached_positions[preset_key] = position
             print(f"Captured: {position}\n")
 
             # Return to HOME for next preset
             controller.go_home()
-            time.sleep(time_between_preset)
+            controller.wait_until_settled(
+                capture_focus=capture_focus,
+                timeout=time_between_preset,
+                target=home_position,
+            )
             controller.clear_buffer()
 
+        if cache_key:
+            preset_cache[cache_key] = cached_positions
+            save_preset_cache(preset_cache)
+
+        # Serialize in one go and write once, json.dump writes every token separately
         with open("preset_positions.json", "w") as f:
-            json.dump(all_positions, f, indent=2)
+            f.write(json.dumps(all_positions, indent=2))
 
         print(f"\nSaved {len(all_positions)} preset positions to preset_positions.json")
         if skipped_presets: